@@ -9,10 +9,44 @@ Copyright (c) 2025
 
 # ========== IMPORTING LIBRARIES ========== #
 from time import time
+from atexit import register
+from gc import (
+    disable,
+    enable,
+    isenabled,
+)
 from hashlib import sha1
-from typing import Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from threading import (
+    Lock,
+    local,
+)
+from io import BytesIO
+from json import (
+    dumps,
+    loads,
+)
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    List,
+    Tuple,
+)
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy import ndarray
+from shapely import linestrings
+from zstandard import (
+    ZstdCompressor,
+    ZstdDecompressor,
+    ZstdError,
+)
 from networkx import (
     MultiDiGraph,
+    MultiGraph,
     NetworkXError,
 )
 from sqlite3 import (
@@ -20,10 +54,6 @@ from sqlite3 import (
     Cursor,
     connect,
 )
-from pickle import (
-    dumps,
-    loads,
-)
 
 from .utils import download_graph_bbox
 ########################
@@ -35,6 +65,18 @@ DB_PATH: str = "graph_cache.sqlite"
 ACCESS_TTL_SECONDS: int = 24 * 3600
 DOWNLOAD_TTL_SECONDS: int = 7 * 24 * 3600
 ROUND: int = 5
+PRAGMAS: Tuple[str, ...] = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=memory",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+)
+MEMORY_CACHE_SIZE: int = 16
+MEMORY_TOUCH_INTERVAL_SECONDS: int = 600
+CLEANUP_INTERVAL_SECONDS: int = 3600
+ZSTD_LEVEL: int = 3
 ########################
 
 
@@ -47,98 +89,469 @@ def normalize_bbox(north: float, south: float, east: float, west: float) -> Tupl
     west  = round(float(west), ROUND)
     return north, south, east, west
 
-def make_bbox_key(north: float, south: float, east: float, west: float) -> str:
-    n, s, e, w = normalize_bbox(north, south, east, west)
-    raw = f"{n},{s},{e},{w}"
+@lru_cache(maxsize=1024)
+def _key_from_norm(bbox: Tuple[float, float, float, float]) -> str:
+    raw = f"{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}"
 
     return sha1(raw.encode()).hexdigest()
+
+def make_bbox_key(north: float, south: float, east: float, west: float) -> str:
+    return _key_from_norm(normalize_bbox(north, south, east, west))
+########################
+
+
+
+# ========== GRAPH SERIALIZATION ========== #
+# Attribute codes: -1 means the attribute is absent, -2 means the value sits in the column's numeric array,
+# anything else indexes the column's table of distinct values
+MISSING_CODE: int = -1
+NUMERIC_CODE: int = -2
+
+def _smallest_int(low: int, high: int) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _encode_columns(prefix: str, rows: List[Dict[str, Any]], skip: Tuple[str, ...]) -> Tuple[List[Dict[str, Any]], Dict[str, ndarray]]:
+    # Gather the present values of every attribute, in first-seen order
+    columns: Dict[str, Tuple[List[int], List[Any]]] = {}
+    for i, d in enumerate(rows):
+        for key, value in d.items():
+            if key in skip:
+                continue
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = ([], [])
+            column[0].append(i)
+            column[1].append(value)
+
+    specs: List[Dict[str, Any]] = []
+    arrays: Dict[str, ndarray] = {}
+    for c, (key, (positions, values)) in enumerate(columns.items()):
+        # The dominant numeric type gets a packed array, everything else (strings, bools, lists) goes into the table
+        n_int = sum(1 for value in values if type(value) is int)
+        n_float = sum(1 for value in values if type(value) is float)
+        numeric_type = int if n_int and n_int >= n_float else float if n_float else None
+
+        codes = np.full(len(rows), MISSING_CODE, dtype=np.int64)
+        numbers: List[Any] = []
+        table: List[Any] = []
+        table_index: Dict[Tuple[type, Any], int] = {}
+        row_codes: List[int] = []
+        for value in values:
+            value_type = type(value)
+            if value_type is numeric_type:
+                numbers.append(value)
+                row_codes.append(NUMERIC_CODE)
+                continue
+            # Keyed by type as well, so 1, 1.0 and True stay distinct
+            try:
+                token = (value_type, value)
+                code = table_index.get(token)
+            except TypeError:
+                token = (value_type, dumps(value, default=str))
+                code = table_index.get(token)
+            if code is None:
+                code = table_index[token] = len(table)
+                table.append(value)
+            row_codes.append(code)
+        codes[positions] = row_codes
+
+        arrays[f'{prefix}_codes_{c}'] = codes.astype(_smallest_int(NUMERIC_CODE, len(table)))
+        if numeric_type is int:
+            packed = np.array(numbers, dtype=np.int64)
+            arrays[f'{prefix}_numbers_{c}'] = packed.astype(_smallest_int(int(packed.min()), int(packed.max())))
+        elif numbers:
+            arrays[f'{prefix}_numbers_{c}'] = np.array(numbers, dtype=np.float64)
+        specs.append({'key': key, 'values': table})
+
+    return specs, arrays
+
+def _decode_columns(prefix: str, specs: List[Dict[str, Any]], arrays: Dict[str, ndarray], rows: List[Dict[str, Any]]) -> None:
+    for c, spec in enumerate(specs):
+        key: str = spec['key']
+        codes = arrays[f'{prefix}_codes_{c}'].astype(np.int64)
+
+        # Table values are decoded once and shared by every row holding them
+        table = np.empty(len(spec['values']) + 1, dtype=object)
+        for i, value in enumerate(spec['values']):
+            table[i] = value
+        # Absent and numeric rows point at the trailing empty slot
+        column = table[np.where(codes >= 0, codes, len(table) - 1)]
+        numeric = codes == NUMERIC_CODE
+        if numeric.any():
+            column[numeric] = arrays[f'{prefix}_numbers_{c}'].tolist()
+
+        present = np.flatnonzero(codes != MISSING_CODE)
+        for i, value in zip(present.tolist(), column[present].tolist()):
+            rows[i][key] = value
+
+def graph_to_arrays(G: MultiDiGraph) -> Dict[str, ndarray]:
+    """Flattens a graph into parallel NumPy arrays (structure of arrays)
+
+       Node coordinates, edge endpoints, keys, lengths and geometries are stored
+       as flat numeric arrays. Every other attribute becomes a column of small
+       integer codes into a table of its distinct values, with its numeric
+       values packed into a typed array.
+
+    Args:
+        G (MultiDiGraph): The graph to flatten
+
+    Returns:
+        Dict[str, ndarray]: The arrays describing the graph
+    """
+    n_nodes: int = G.number_of_nodes()
+    n_edges: int = G.number_of_edges()
+
+    node_ids = np.fromiter(G.nodes, dtype=np.int64, count=n_nodes)
+    node_index: Dict[Any, int] = {n: i for i, n in enumerate(G.nodes)}
+    node_xy = np.empty((n_nodes, 2), dtype=np.float64)
+    node_rows: List[Dict[str, Any]] = []
+    for i, (_, d) in enumerate(G.nodes(data=True)):
+        node_xy[i, 0] = d['x']
+        node_xy[i, 1] = d['y']
+        node_rows.append(d)
+
+    edge_u = np.empty(n_edges, dtype=np.int32)
+    edge_v = np.empty(n_edges, dtype=np.int32)
+    edge_key = np.empty(n_edges, dtype=np.int64)
+    edge_length = np.full(n_edges, np.nan, dtype=np.float64)
+    geom_offsets = np.zeros(n_edges + 1, dtype=np.int64)
+    geom_parts: List[ndarray] = []
+    edge_rows: List[Dict[str, Any]] = []
+    for i, (u, v, key, d) in enumerate(G.edges(keys=True, data=True)):
+        edge_u[i] = node_index[u]
+        edge_v[i] = node_index[v]
+        edge_key[i] = key
+        if 'length' in d:
+            edge_length[i] = d['length']
+        if 'geometry' in d:
+            coords = np.asarray(d['geometry'].coords, dtype=np.float64)
+            geom_parts.append(coords)
+            geom_offsets[i + 1] = len(coords)
+        edge_rows.append(d)
+
+    np.cumsum(geom_offsets, out=geom_offsets)
+    geom_xy = np.concatenate(geom_parts) if geom_parts else np.empty((0, 2), dtype=np.float64)
+
+    node_specs, node_columns = _encode_columns('node', node_rows, ('x', 'y'))
+    edge_specs, edge_columns = _encode_columns('edge', edge_rows, ('length', 'geometry'))
+
+    side_table: bytes = dumps(
+        {'graph': G.graph, 'nodes': node_specs, 'edges': edge_specs},
+        default=str,
+    ).encode()
+
+    return {
+        'node_ids': node_ids,
+        'node_xy': node_xy,
+        'edge_u': edge_u,
+        'edge_v': edge_v,
+        'edge_key': edge_key.astype(_smallest_int(int(edge_key.min(initial=0)), int(edge_key.max(initial=0)))),
+        'edge_length': edge_length,
+        'geom_offsets': geom_offsets.astype(_smallest_int(0, int(geom_offsets[-1]))),
+        'geom_xy': geom_xy,
+        'side_table': np.frombuffer(side_table, dtype=np.uint8),
+        **node_columns,
+        **edge_columns,
+    }
+
+def arrays_to_graph(arrays: Dict[str, ndarray]) -> MultiDiGraph:
+    """Rebuilds a graph from the arrays produced by `graph_to_arrays`
+
+    Args:
+        arrays (Dict[str, ndarray]): The arrays describing the graph
+
+    Returns:
+        MultiDiGraph: The rebuilt graph
+    """
+    side_table: Dict[str, Any] = loads(arrays['side_table'].tobytes())
+    G = MultiDiGraph(**side_table['graph'])
+
+    node_ids = arrays['node_ids']
+    node_rows: List[Dict[str, Any]] = [{'x': x, 'y': y} for x, y in arrays['node_xy'].tolist()]
+    _decode_columns('node', side_table['nodes'], arrays, node_rows)
+
+    # Fill the adjacency dicts directly, add_nodes_from/add_edges_from cost more than the whole decode
+    node_list: List[int] = node_ids.tolist()
+    G._node.update(zip(node_list, node_rows))
+    G._succ.update((n, {}) for n in node_list)
+    G._pred.update((n, {}) for n in node_list)
+
+    edge_length = arrays['edge_length']
+    has_length = ~np.isnan(edge_length)
+    edge_rows: List[Dict[str, Any]] = [{} for _ in range(len(edge_length))]
+    for i, length in zip(np.flatnonzero(has_length).tolist(), edge_length[has_length].tolist()):
+        edge_rows[i]['length'] = length
+
+    # Build every edge geometry in a single vectorized call
+    counts = np.diff(arrays['geom_offsets'])
+    has_geom = counts > 0
+    if has_geom.any():
+        geoms = linestrings(
+            arrays['geom_xy'],
+            indices=np.repeat(np.arange(int(has_geom.sum())), counts[has_geom]),
+        )
+        for i, geom in zip(np.flatnonzero(has_geom).tolist(), geoms):
+            edge_rows[i]['geometry'] = geom
+
+    _decode_columns('edge', side_table['edges'], arrays, edge_rows)
+
+    succ, pred = G._succ, G._pred
+    for u, v, key, d in zip(
+        node_ids[arrays['edge_u']].tolist(),
+        node_ids[arrays['edge_v']].tolist(),
+        arrays['edge_key'].tolist(),
+        edge_rows,
+    ):
+        # Both directions share one key dict, as in MultiDiGraph.add_edge
+        keydict = succ[u].get(v)
+        if keydict is None:
+            keydict = succ[u][v] = {}
+            pred[v][u] = keydict
+        keydict[key] = d
+    return G
+
+def graph_to_blob(G: MultiDiGraph) -> bytes:
+    buffer = BytesIO()
+    np.savez(buffer, **graph_to_arrays(G))
+    # Compressors are not thread-safe, so each call gets its own (blobs are built in a thread pool)
+    return ZstdCompressor(level=ZSTD_LEVEL).compress(buffer.getvalue())
+
+def blob_to_graph(blob: bytes) -> MultiDiGraph:
+    raw: bytes = ZstdDecompressor().decompress(blob)
+    with np.load(BytesIO(raw), allow_pickle=False) as npz:
+        arrays: Dict[str, ndarray] = {name: npz[name] for name in npz.files}
+
+    # The rebuilt graph holds no reference cycles, so pause the cyclic GC instead of
+    # letting it rescan the heap after every burst of new attribute dicts
+    gc_enabled: bool = isenabled()
+    disable()
+    try:
+        return arrays_to_graph(arrays)
+    finally:
+        if gc_enabled:
+            enable()
 ########################
 
 
 
 # ========== DATABASE SETUP ========== #
-def init_cache() -> None:
-    conn: Connection = connect(DB_PATH)
+def _open(check_same_thread: bool = True) -> Connection:
+    conn: Connection = connect(DB_PATH, check_same_thread=check_same_thread, isolation_level=None)
     c: Cursor = conn.cursor()
-    c.execute("""
+    for pragma in PRAGMAS:
+        c.execute(pragma)
+    return conn
+
+def _open_reader() -> Connection:
+    # One read connection per worker thread, opened lazily and kept for reuse
+    conn: Optional[Connection] = getattr(_READERS, "conn", None)
+    if conn is None:
+        conn = _open()
+        _READERS.conn = conn
+    return conn
+
+def _execute_write(query: str, params: Tuple) -> None:
+    # All writes share the single write connection under an immediate transaction
+    with _WRITE_LOCK:
+        _WRITE_CONN.execute("BEGIN IMMEDIATE")
+        try:
+            _WRITE_CONN.execute(query, params)
+        except Exception:
+            _WRITE_CONN.execute("ROLLBACK")
+            raise
+        _WRITE_CONN.execute("COMMIT")
+
+def _execute_write_many(query: str, rows: List[Tuple]) -> None:
+    # Batches all rows into one transaction so the commit cost is paid once
+    with _WRITE_LOCK:
+        _WRITE_CONN.execute("BEGIN IMMEDIATE")
+        try:
+            _WRITE_CONN.executemany(query, rows)
+        except Exception:
+            _WRITE_CONN.execute("ROLLBACK")
+            raise
+        _WRITE_CONN.execute("COMMIT")
+
+def init_cache() -> None:
+    _execute_write("""
         CREATE TABLE IF NOT EXISTS graph_cache(
             cache_key TEXT PRIMARY KEY,
             graph_blob BLOB NOT NULL,
             download_time REAL NOT NULL DEFAULT (strftime('%s', 'now')),
             last_access REAL NOT NULL
         )
-    """)
-    conn.commit()
-    conn.close()
+    """, ())
+
+_WRITE_CONN: Connection = _open(check_same_thread=False)
+_WRITE_LOCK: Lock = Lock()
+_READERS: local = local()
+register(_WRITE_CONN.close)
+
+init_cache()
 ########################
 
 
 
 # ========== CACHING LOGIC ========== #
-def load_from_cache(cache_key: str):
-    conn: Connection = connect(DB_PATH)
-    c: Cursor = conn.cursor()
-    c.execute("SELECT graph_blob FROM graph_cache WHERE cache_key = ?", (cache_key,))
+def load_from_cache(cache_key: str) -> Optional[Tuple[MultiDiGraph, float]]:
+    current_time: float = time()
+    c: Cursor = _open_reader().cursor()
+    c.execute("SELECT graph_blob, download_time FROM graph_cache WHERE cache_key = ? AND download_time >= ?",
+              (cache_key, current_time - DOWNLOAD_TTL_SECONDS))
     row = c.fetchone()
 
     if row is None:
-        conn.close()
         return None
     
-    c.execute("UPDATE graph_cache SET last_access = ? WHERE cache_key = ?", 
-              (time(), cache_key))
-    conn.commit()
-    conn.close()
+    try:
+        G: MultiDiGraph = blob_to_graph(row[0])
+    except (KeyError, ValueError, ZstdError):
+        # Entry written in an older format, treat it as a miss so it gets replaced
+        return None
 
-    return loads(row[0])
+    touch_cache(cache_key, current_time)
+
+    return G, row[1]
+
+def touch_cache(cache_key: str, current_time: float) -> None:
+    _execute_write("UPDATE graph_cache SET last_access = ? WHERE cache_key = ?",
+                   (current_time, cache_key))
 
 def save_to_cache(cache_key: str, G: MultiDiGraph) -> None:
-    conn: Connection = connect(DB_PATH)
-    c: Cursor = conn.cursor()
-    blob = dumps(G)
+    save_many_to_cache([(cache_key, G)])
+
+def save_many_to_cache(items: List[Tuple[str, MultiDiGraph]]) -> None:
+    if not items:
+        return
+
+    # Serialize the graphs first (CPU), then write them in a single transaction (IO)
+    if len(items) == 1:
+        blobs = [graph_to_blob(items[0][1])]
+    else:
+        with ThreadPoolExecutor() as executor:
+            blobs = list(executor.map(graph_to_blob, (G for _, G in items)))
+
     current_time: float = time()
-    c.execute(
-        "REPLACE INTO graph_cache (cache_key, graph_blob, download_time, last_access) VALUES (?, ?, ?, ?)",
+    rows = [
         (cache_key, blob, current_time, current_time)
+        for (cache_key, _), blob in zip(items, blobs)
+    ]
+    _execute_write_many(
+        "REPLACE INTO graph_cache (cache_key, graph_blob, download_time, last_access) VALUES (?, ?, ?, ?)",
+        rows
     )
-    conn.commit()
-    conn.close()
 
 def cleanup_cache() -> None:
     current_time: float = time()
     access_cutoff = current_time - ACCESS_TTL_SECONDS
     download_cutoff = current_time - DOWNLOAD_TTL_SECONDS
 
-    conn: Connection = connect(DB_PATH)
-    c: Cursor = conn.cursor()
-    c.execute("""
+    _execute_write("""
         DELETE FROM graph_cache 
         WHERE last_access < ? OR download_time < ?
     """, (access_cutoff, download_cutoff))
-    conn.commit()
-    conn.close()
 
+_next_cleanup: float = 0.0
+_CLEANUP_LOCK: Lock = Lock()
 
+def cleanup_due() -> bool:
+    # True at most once per CLEANUP_INTERVAL_SECONDS, so callers can schedule the cleanup off the request path
+    global _next_cleanup
+    with _CLEANUP_LOCK:
+        current_time: float = time()
+        if current_time < _next_cleanup:
+            return False
+        _next_cleanup = current_time + CLEANUP_INTERVAL_SECONDS
+        return True
+########################
 
-# ========== FETCH GRAPH ========== #
-def get_graph(north: float, south: float, east: float, west: float) -> MultiDiGraph:
-    init_cache()
 
-    cache_key: str = make_bbox_key(north, south, east, west)
+
+# ========== IN-MEMORY CACHE ========== #
+# Graphs handed out from here are shared, callers must copy before mutating
+# Entries: [graph, SQLite row key, download time, last time the row's last_access was refreshed]
+_MEMORY_CACHE: "OrderedDict[str, List[Any]]" = OrderedDict()
+_MEMORY_LOCK: Lock = Lock()
+
+def memory_get(cache_key: str) -> Optional[Tuple[MultiDiGraph, float]]:
+    current_time: float = time()
+    touch_key: Optional[str] = None
+    with _MEMORY_LOCK:
+        entry = _MEMORY_CACHE.get(cache_key)
+        if entry is None:
+            return None
+
+        G, row_key, download_time, touched = entry
+        if current_time - download_time >= DOWNLOAD_TTL_SECONDS:
+            # Same download TTL as the SQLite rows, so hot graphs still get refreshed
+            del _MEMORY_CACHE[cache_key]
+            return None
+
+        _MEMORY_CACHE.move_to_end(cache_key)
+        # Keep the SQLite row alive while the graph is served from memory, writing at most once per interval
+        if current_time - touched >= MEMORY_TOUCH_INTERVAL_SECONDS:
+            entry[3] = current_time
+            touch_key = row_key
+
+    if touch_key is not None:
+        touch_cache(touch_key, current_time)
+    return G, download_time
+
+def memory_put(cache_key: str, G: MultiDiGraph, download_time: float, row_key: Optional[str] = None) -> None:
+    with _MEMORY_LOCK:
+        _MEMORY_CACHE[cache_key] = [G, row_key or cache_key, download_time, time()]
+        _MEMORY_CACHE.move_to_end(cache_key)
+        while len(_MEMORY_CACHE) > MEMORY_CACHE_SIZE:
+            _MEMORY_CACHE.popitem(last=False)
+########################
+
+
+
+# ========== FETCH GRAPH ========== #
+def _get_graph_entry(cache_key: str, north: float, south: float, east: float, west: float) -> Tuple[MultiDiGraph, float]:
+    # Try the in-process cache first to skip deserialization entirely
+    entry = memory_get(cache_key)
+    if entry is not None:
+        return entry
 
     # Try loading from cache
-    cached = load_from_cache(cache_key)
-    if cached is not None:
-        return cached
+    entry = load_from_cache(cache_key)
+    if entry is not None:
+        memory_put(cache_key, *entry)
+        return entry
 
     try:
         G: MultiDiGraph = download_graph_bbox(north=north, south=south, east=east, west=west)
     except NetworkXError as e:
         raise NetworkXError(str(e))
 
+    download_time: float = time()
     save_to_cache(cache_key, G)
+    memory_put(cache_key, G, download_time)
 
-    cleanup_cache()
+    return G, download_time
 
-    return G
+def get_graph(north: float, south: float, east: float, west: float) -> MultiDiGraph:
+    cache_key: str = make_bbox_key(north, south, east, west)
+    return _get_graph_entry(cache_key, north, south, east, west)[0]
+
+def get_undirected_graph(north: float, south: float, east: float, west: float) -> MultiGraph:
+    # The undirected routing graph is derived once per bbox and kept next to the directed one
+    cache_key: str = make_bbox_key(north, south, east, west)
+    undirected_key: str = cache_key + ":undirected"
+
+    entry = memory_get(undirected_key)
+    if entry is not None:
+        return entry[0]
+
+    G, download_time = _get_graph_entry(cache_key, north, south, east, west)
+    G_undirected: MultiGraph = G.to_undirected()
+    # Shares the directed graph's download time and SQLite row
+    memory_put(undirected_key, G_undirected, download_time, row_key=cache_key)
+
+    return G_undirected
 ########################
\ No newline at end of file
@@ -10,7 +10,11 @@ Copyright (c) 2025
 # ========== IMPORTING LIBRARIES ========== #
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi import HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import BackgroundTasks
+from fastapi.responses import (
+    JSONResponse,
+    Response,
+)
 from fastapi.middleware.cors import CORSMiddleware
 
 from starlette.status import HTTP_200_OK
@@ -18,16 +22,28 @@ from starlette.status import HTTP_400_BAD_REQUEST
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
 import asyncio
-import json
+import orjson
+import queue
+import threading
 import sys
 import re
 from pathlib import Path
-from typing import List
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 
 import torch
+import torch.nn.functional as F
 import cv2
 import numpy as np
-import threading
+from torchvision.io import (
+    ImageReadMode,
+    decode_jpeg,
+)
 
 from ultralytics import YOLO
 from models.rescunet import (
@@ -51,7 +67,10 @@ from .utils import (
 )
 
 from .cache import (
+    cleanup_cache,
+    cleanup_due,
     get_graph,
+    get_undirected_graph,
     make_bbox_key,
 )
 
@@ -77,6 +96,8 @@ except ImportError:
 # ========== GLOBAL VARS & CONFIG ========== #
 current_mode = "rgb"
 device: torch.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+fire_stream = torch.cuda.Stream() if device.type == "cuda" else None
+people_stream = torch.cuda.Stream() if device.type == "cuda" else None
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 ########################
@@ -171,49 +192,75 @@ manager = ConnectionManager()
 class TextAnalysisRequest(BaseModel):
     text: str
 
+# URLs and punctuation are stripped in a single pass
+_CLEAN_RE = re.compile(r'https?://\S+|www\.\S+|[^\w\s]')
+
 def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    text = re.sub(r'[^\w\s]', '', text)
-    return text
+    return _CLEAN_RE.sub('', str(text).lower())
 
 def tokenize_text(text: str, vocab: dict, max_len: int = 100) -> torch.Tensor:
     text = clean_text(text)
     words = text.split()
-    
-    # Map words to indices
-    indices = [vocab.get(word, vocab.get('<UNK>', 1)) for word in words]
-    
-    # Pad or Truncate
-    if len(indices) < max_len:
-        indices += [vocab.get('<PAD>', 0)] * (max_len - len(indices))
-    else:
-        indices = indices[:max_len]
-        
-    return torch.tensor([indices], dtype=torch.long) # Batch size 1
+
+    unk = vocab.get('<UNK>', 1)
+    pad = vocab.get('<PAD>', 0)
+
+    # Map words to indices into a pre-padded buffer (truncates at max_len)
+    indices = np.full(max_len, pad, dtype=np.int64)
+    for i, word in zip(range(max_len), words):
+        indices[i] = vocab.get(word, unk)
+
+    return torch.from_numpy(indices).unsqueeze(0) # Batch size 1
 ########################
 
 # ========== INFERENCE HELPER ========== #
-def run_inference(frame_bytes, mode):
-    # Decode and Resize in thread
+def frame_to_tensor(img: np.ndarray) -> torch.Tensor:
+    # BGR HWC uint8 -> RGB BCHW float in [0, 1], the layout YOLO expects for tensor inputs
+    tensor = torch.from_numpy(np.ascontiguousarray(img[..., ::-1])).to(device, non_blocking=True)
+    return tensor.permute(2, 0, 1).unsqueeze(0).float().div_(255)
+
+def extract_boxes(result, threshold: float = 0.45) -> Tuple[List[List[int]], np.ndarray, List[int]]:
+    # Pull every box to the host in one copy per field, then keep only confident ones
+    boxes = result.boxes
+    confs = boxes.conf.cpu().numpy()
+    keep = confs >= threshold
+    xyxy = boxes.xyxy.cpu().numpy()[keep].astype(np.int32).tolist()
+    classes = boxes.cls.cpu().numpy()[keep].astype(np.int32).tolist()
+    return xyxy, confs[keep], classes
+
+def decode_frame(frame_bytes: bytes) -> Tuple[Optional[np.ndarray], Optional[torch.Tensor]]:
+    # Returns the 640x640 BGR image used for drawing and the model-ready tensor
+    if device.type == "cuda":
+        # Decode and resize on the GPU with nvJPEG, download only the small resized frame
+        try:
+            data = torch.frombuffer(bytearray(frame_bytes), dtype=torch.uint8)
+            decoded = decode_jpeg(data, mode=ImageReadMode.RGB, device=device)
+        except RuntimeError:
+            return None, None
+        tensor = F.interpolate(decoded.unsqueeze(0).float(), size=(640, 640), mode="bilinear", align_corners=False).div_(255)
+        rgb = tensor[0].mul(255).round_().clamp_(0, 255).byte().permute(1, 2, 0)
+        img = np.ascontiguousarray(rgb.cpu().numpy()[..., ::-1])
+        return img, tensor
+
     nparr = np.frombuffer(frame_bytes, np.uint8)
     img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
     if img is None:
-        return None
-    
+        return None, None
     img = cv2.resize(img, (640, 640))
+    return img, frame_to_tensor(img)
+
+def run_inference(frame_bytes, mode):
+    # Decode and Resize in thread
+    img, tensor = decode_frame(frame_bytes)
+    if img is None:
+        return None
 
     if mode == "thermal" and thermal_model:
         # Inference (Persons)
         results = thermal_model(img)
         for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = int(box.xyxy[0][0]), int(box.xyxy[0][1]), int(box.xyxy[0][2]), int(box.xyxy[0][3])
-                conf = box.conf[0].cpu().numpy()
-                
-                if conf < 0.45: continue # Threshold
-
+            xyxy, confs, _ = extract_boxes(result)
+            for (x1, y1, x2, y2), conf in zip(xyxy, confs):
                 cv2.rectangle(img, (x1, y1), (x2, y2), (255, 0, 0), 2)
                 label = f"Person {conf:.2f}"
                 
@@ -225,37 +272,30 @@ def run_inference(frame_bytes, mode):
         fire_results = None
         people_results = None
 
-        def run_fire_model():
-            nonlocal fire_results
-            if fire_model:
-                fire_results = fire_model(img)
-        
-        def run_people_model():
-            nonlocal people_results
-            if people_model:
-                people_results = people_model(img)
-        
-        # Run both models in parallel
-        fire_thread = threading.Thread(target=run_fire_model)
-        people_thread = threading.Thread(target=run_people_model)
-        
-        fire_thread.start()
-        people_thread.start()
-        
-        fire_thread.join()
-        people_thread.join()
+        # The frame tensor is shared between both models
+        with torch.inference_mode():
+            if fire_stream is not None:
+                # Overlap both forward passes on separate CUDA streams
+                fire_stream.wait_stream(torch.cuda.current_stream())
+                people_stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(fire_stream):
+                    if fire_model:
+                        fire_results = fire_model(tensor)
+                with torch.cuda.stream(people_stream):
+                    if people_model:
+                        people_results = people_model(tensor)
+                torch.cuda.synchronize()
+            else:
+                if fire_model:
+                    fire_results = fire_model(tensor)
+                if people_model:
+                    people_results = people_model(tensor)
         
         # Inference (Fire)
         if fire_results:
             for result in fire_results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = int(box.xyxy[0][0]), int(box.xyxy[0][1]), int(box.xyxy[0][2]), int(box.xyxy[0][3])
-                    conf = box.conf[0].cpu().numpy()
-                
-                    if conf < 0.45: continue # Threshold
-
-                    cls = int(box.cls[0])
+                xyxy, confs, classes = extract_boxes(result)
+                for (x1, y1, x2, y2), conf, cls in zip(xyxy, confs, classes):
                     class_name = result.names[cls]
                     
                     # Color Selection (BGR)
@@ -276,13 +316,8 @@ def run_inference(frame_bytes, mode):
         # Inference (People)
         if people_results:
             for result in people_results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = int(box.xyxy[0][0]), int(box.xyxy[0][1]), int(box.xyxy[0][2]), int(box.xyxy[0][3])
-                    conf = box.conf[0].cpu().numpy()
-                
-                    if conf < 0.45: continue # Threshold
-
+                xyxy, confs, _ = extract_boxes(result)
+                for (x1, y1, x2, y2), conf in zip(xyxy, confs):
                     cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
                     label = f"Person {conf:.2f}"
                 
@@ -295,6 +330,90 @@ def run_inference(frame_bytes, mode):
     return encoded_img.tobytes()
 ########################
 
+# ========== INFERENCE WORKER ========== #
+# A single worker thread owns the models so frames never contend for the CUDA context.
+# Both queues hold one item and drop the stale one, so the newest frame always wins.
+frame_queue: "queue.Queue[Tuple[bytes, str]]" = queue.Queue(maxsize=1)
+result_queue: Optional["asyncio.Queue[bytes]"] = None
+event_loop: Optional[asyncio.AbstractEventLoop] = None
+broadcast_task: Optional["asyncio.Task[None]"] = None
+
+def submit_frame(frame_bytes: bytes, mode: str) -> None:
+    try:
+        frame_queue.put_nowait((frame_bytes, mode))
+    except queue.Full:
+        try:
+            frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+        frame_queue.put_nowait((frame_bytes, mode))
+
+def publish_result(frame_bytes: bytes) -> None:
+    # Runs on the event loop thread
+    if result_queue.full():
+        result_queue.get_nowait()
+    result_queue.put_nowait(frame_bytes)
+
+def inference_worker() -> None:
+    while True:
+        frame_bytes, mode = frame_queue.get()
+        try:
+            annotated = run_inference(frame_bytes, mode)
+        except Exception as e:
+            print(f"Inference error: {e}")
+            continue
+
+        if annotated:
+            event_loop.call_soon_threadsafe(publish_result, annotated)
+
+async def broadcast_results() -> None:
+    while True:
+        frame_bytes = await result_queue.get()
+        await manager.broadcast(frame_bytes)
+
+@app.on_event("startup")
+async def start_inference_worker() -> None:
+    global event_loop, result_queue, broadcast_task
+    event_loop = asyncio.get_running_loop()
+    result_queue = asyncio.Queue(maxsize=1)
+    threading.Thread(target=inference_worker, name="inference-worker", daemon=True).start()
+    broadcast_task = asyncio.create_task(broadcast_results())
+########################
+
+# ========== ROUTING HELPERS ========== #
+def extract_edge_arrays(G) -> Tuple[List[Tuple[int, int, int]], np.ndarray, np.ndarray]:
+    # Edge keys with their lengths and integer states, in the graph's edge order
+    ordered_edges = []
+    lengths = []
+    states = []
+    for u, v, k, d in G.edges(keys=True, data=True):
+        ordered_edges.append((u, v, k))
+        lengths.append(d.get('length', 1.0))
+        states.append(d.get('state_int', 0))
+    return ordered_edges, np.array(lengths, dtype=np.float64), np.array(states, dtype=np.uint8)
+
+def assign_travel_costs(G, ordered_edges, lengths: np.ndarray, states: np.ndarray, probs: Optional[np.ndarray] = None) -> np.ndarray:
+    # travel_cost = length * state multiplier * neural discount, computed for all edges at once
+    mult = np.where(states == 2, 10000.0, np.where(states == 1, 5.0, 1.0))
+    costs = lengths * mult
+    if probs is not None:
+        costs *= 1.0 - probs.astype(np.float64) * 0.8
+
+    for (u, v, k), cost in zip(ordered_edges, costs.tolist()):
+        G[u][v][k]['travel_cost'] = cost
+    return costs
+
+def route_edge(G, u, v, memo: Dict[Tuple[int, int], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    # Edge drawn for a route step: prefer edges with geometry, then the cheapest one.
+    # Picked only for steps on a route and memoized per node pair (both orientations, the graph is undirected)
+    if (u, v) not in memo:
+        edge_data = None
+        if G.has_edge(u, v):
+            edge_data = min(G[u][v].values(), key=lambda x: (0 if 'geometry' in x else 1, x.get('travel_cost', float('inf'))))
+        memo[(u, v)] = memo[(v, u)] = edge_data
+    return memo[(u, v)]
+########################
+
 # ========== ENDPOINTS ========== #
 
 @app.websocket("/ws/drone")
@@ -310,13 +429,9 @@ async def websocket_drone(websocket: WebSocket):
                 await asyncio.sleep(0.01) # Yield control to allow disconnects to process
                 continue
 
-            # Inference (Offloaded to thread)
+            # Inference (Handed to the inference worker, results are broadcast as they finish)
             global current_mode
-            frame_bytes = await asyncio.to_thread(run_inference, data, current_mode)
-            
-            if frame_bytes:
-                # Broadcast to clients
-                await manager.broadcast(frame_bytes)
+            submit_frame(data, current_mode)
                 
     except WebSocketDisconnect:
         print("Drone disconnected")
@@ -330,7 +445,7 @@ async def websocket_client(websocket: WebSocket):
         while True:
             # Receive control commands
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             if "mode" in message:
                 global current_mode
                 current_mode = message["mode"]
@@ -343,18 +458,19 @@ def health_check():
     return JSONResponse(content={"status": "ok"}, status_code=HTTP_200_OK)
 
 @app.post("/api/load-graph")
-def load_graph(bbox: Bbox) -> JSONResponse:
+def load_graph(bbox: Bbox, background_tasks: BackgroundTasks) -> Response:
+    if cleanup_due():
+        background_tasks.add_task(cleanup_cache)
     try:
         G: MultiDiGraph = get_graph(north=bbox.north, south=bbox.south, east=bbox.east, west=bbox.west)
     except NetworkXError as e:
         return JSONResponse(content={"error": str(e)}, status_code=HTTP_400_BAD_REQUEST)
     session_id = make_bbox_key(bbox.north, bbox.south, bbox.east, bbox.west)
-    geojson: str = graph_to_json(G)
     if G is not None:
-        return JSONResponse(content={
-            "graph_uuid": session_id,
-            "geojson": geojson
-        }, status_code=HTTP_200_OK)
+        geojson: bytes = graph_to_json(G)
+        # The GeoJSON is already serialized, splice it in as-is instead of re-encoding it
+        content: bytes = b'{"graph_uuid":' + orjson.dumps(session_id) + b',"geojson":' + geojson + b'}'
+        return Response(content=content, media_type="application/json", status_code=HTTP_200_OK)
     else:
         return JSONResponse(content={"error": "Failed to download graph"}, status_code=HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -407,63 +523,43 @@ def analyze_text(req: TextAnalysisRequest) -> JSONResponse:
 
 
 @app.post("/api/infer-routes")
-def infer_routes(req: RouteRequest) -> JSONResponse:
+def infer_routes(req: RouteRequest, background_tasks: BackgroundTasks) -> Response:
+    if cleanup_due():
+        background_tasks.add_task(cleanup_cache)
     try:
-        G_cached = get_graph(req.bbox.north, req.bbox.south, req.bbox.east, req.bbox.west)
-        if not G_cached:
+        G_undirected = get_undirected_graph(req.bbox.north, req.bbox.south, req.bbox.east, req.bbox.west)
+        if not G_undirected:
             return JSONResponse(content={"error": "Graph not found"}, status_code=HTTP_500_INTERNAL_SERVER_ERROR)
         
         # Deduplicate nodes
         clean_nodes = deduplicate_nodes(req.nodes)
         
-        # Copy the cached graph
-        G_viz = G_cached.copy()
-        G_routing = G_cached.copy().to_undirected()
+        # Copy the cached undirected graph since the steps below mutate it
+        G_routing = G_undirected.copy()
 
         # Add the edge states
-        G_viz = edit_edges(G_viz, req.modified_edges)
         G_routing = edit_edges(G_routing, req.modified_edges)
         
         # Add the survivor/pickup nodes into the graph
-        G_viz, _ = integrate_nodes_into_graph(G_viz, clean_nodes)
-        G_routing, snapped_data = integrate_nodes_into_graph(G_routing, clean_nodes)
+        # The copy shares its edges with the cached graph, so the cached spatial index is reused
+        G_routing, snapped_data = integrate_nodes_into_graph(G_routing, clean_nodes, index_graph=G_undirected)
 
+        probs = None
         if rescunet_model is not None:
             try:
-                data, ordered_edges = extract_pyg_data(G_routing)
+                data, ordered_edges, lengths, states = extract_pyg_data(G_routing)
                 data = data.to(device=device)
                 with torch.no_grad():
                     logits = rescunet_model(data.x, data.edge_index, data.edge_attr, batch=None)
                     probs = torch.sigmoid(logits).cpu().numpy()
-
-                for i, (u, v, k) in enumerate(ordered_edges):
-                    prob = float(probs[i])
-                    length: float = G_routing[u][v][k].get('length', 1.0)
-                    state: str = G_routing[u][v][k].get('state', 'clear')
-                    
-                    base_mult = 1.0
-                    if state == 'blocked': base_mult = 10000.0
-                    elif state == 'partial': base_mult = 5.0
-                    
-                    neural_discount = 1.0 - (prob * 0.8)
-                    
-                    G_routing[u][v][k]['travel_cost'] = length * base_mult * neural_discount
-                    
             except Exception as e:
                 print(f"GNN Inference Failed: {e}. Falling back to standard weights.")
-                # Fallback weighting if GNN fails
-                for u, v, k, d in G_routing.edges(keys=True, data=True):
-                    length = d.get('length', 1)
-                    state = d.get('state', 'clear')
-                    mult = 10000 if state == 'blocked' else (5 if state == 'partial' else 1)
-                    G_routing[u][v][k]['travel_cost'] = length * mult
-        else:
-            # Adding the weights to the edges
-            for u, v, k, d in G_routing.edges(keys=True, data=True):
-                length = d.get('length', 1)
-                state = d.get('state', 'clear')
-                mult = 10000 if state == 'blocked' else (5 if state == 'partial' else 1)
-                G_routing[u][v][k]['travel_cost'] = length * mult
+
+        if probs is None:
+            # Standard weights when the GNN is unavailable or failed
+            ordered_edges, lengths, states = extract_edge_arrays(G_routing)
+
+        travel_costs = assign_travel_costs(G_routing, ordered_edges, lengths, states, probs)
 
         # Getting the IDs of the pickup nodes
         pickups_ids = [
@@ -472,24 +568,27 @@ def infer_routes(req: RouteRequest) -> JSONResponse:
         if not pickups_ids:
             raise HTTPException(HTTP_400_BAD_REQUEST, "No pickups defined.")
 
-        # Map GraphID -> {urgency, count, graph_id}
+        # Aggregate per GraphID: Max urgency, Sum count
+        urgencies = {}
+        counts = {}
         survivors_map = {}
         
         for item in snapped_data:
-            if item['req'].type != 'survivor':
+            req_node = item['req']
+            if req_node.type != 'survivor':
                 continue
             
             gid = item['graph_id']
-            urg = item['req'].urgency
-            cnt = item['req'].count
-            
-            if gid in survivors_map:
-                # Aggregate: Max urgency, Sum count
-                survivors_map[gid]['req'].urgency = max(survivors_map[gid]['req'].urgency, urg)
-                survivors_map[gid]['req'].count += cnt
-            else:
-                # Store reference
-                survivors_map[gid] = item
+            urg = req_node.urgency
+            urgencies[gid] = urg if gid not in urgencies else max(urgencies[gid], urg)
+            counts[gid] = counts.get(gid, 0) + req_node.count
+            # Store reference
+            survivors_map.setdefault(gid, item)
+        
+        # Write the aggregates back once per survivor
+        for gid, item in survivors_map.items():
+            item['req'].urgency = urgencies[gid]
+            item['req'].count = counts[gid]
         
         # Convert back to list for solver
         survivors_data = list(survivors_map.values())
@@ -498,12 +597,13 @@ def infer_routes(req: RouteRequest) -> JSONResponse:
         all_paths_node_ids = []
 
         if USE_CPP_SOLVER:
-            # Get Edges
-            edges_for_cpp = []
-            for u, v, k, d in G_routing.edges(keys=True, data=True):
-                weight = d.get('travel_cost', d.get('length', 1))
-                edges_for_cpp.append((int(u), int(v), float(weight)))
-                edges_for_cpp.append((int(v), int(u), float(weight))) 
+            # Get Edges as contiguous arrays (both directions)
+            endpoints = np.array(ordered_edges, dtype=np.int64).reshape(-1, 3)
+            u_arr = endpoints[:, 0]
+            v_arr = endpoints[:, 1]
+            u_bi = np.concatenate([u_arr, v_arr])
+            v_bi = np.concatenate([v_arr, u_arr])
+            w_bi = np.concatenate([travel_costs, travel_costs])
             
             # Get Survivor Nodes
             survivor_input = []
@@ -518,40 +618,52 @@ def infer_routes(req: RouteRequest) -> JSONResponse:
             all_paths_node_ids = rescunet.solve_routes(
                 survivor_input,
                 [int(x) for x in pickups_ids],
-                edges_for_cpp
+                u_bi,
+                v_bi,
+                w_bi
             )
         else:
             all_paths_node_ids = python_router.solve_routes(G_routing, survivors_data, pickups_ids)
 
         # Construct Response
         routes_features = []
+        # Read node attributes straight from the adjacency storage, bypassing the NodeView wrapper
+        nodes_view = G_routing._node
+        node_xy = {
+            n: (nodes_view[n]['x'], nodes_view[n]['y'])
+            for path_nodes in all_paths_node_ids for n in path_nodes
+        }
+        route_edges = {}
         for vehicle_idx, path_nodes in enumerate(all_paths_node_ids):
             if len(path_nodes) < 2:
                 continue
 
-            full_path_coords = []
+            # Collect one coordinate block per step and join them once per route
+            segments = []
             for i in range(len(path_nodes) - 1):
                 u = path_nodes[i]; v = path_nodes[i+1]
-                if G_routing.has_edge(u, v):
-                    edge_data = min(G_routing[u][v].values(), key=lambda x: (0 if 'geometry' in x else 1, x.get('travel_cost', float('inf'))))
-
+                edge_data = route_edge(G_routing, u, v, route_edges)
+                if edge_data is not None:
                     if 'geometry' in edge_data:
-                        coords = list(edge_data['geometry'].coords)
-                        u_node = G_routing.nodes[u]
-                        start_dist = (coords[0][0]-u_node['x'])**2 + (coords[0][1]-u_node['y'])**2
-                        end_dist = (coords[-1][0]-u_node['x'])**2 + (coords[-1][1]-u_node['y'])**2
-                        if end_dist < start_dist: coords.reverse()
-                        full_path_coords.extend(coords)
+                        coords = np.asarray(edge_data['geometry'].coords, dtype=np.float64)
+                        # Squared distance from u to the first and last vertex in one go
+                        ends_dist = ((coords[[0, -1]] - node_xy[u])**2).sum(axis=1)
+                        if ends_dist[1] < ends_dist[0]: coords = coords[::-1]
+                        segments.append(coords)
                     else:
-                        full_path_coords.extend([[G_routing.nodes[u]['x'], G_routing.nodes[u]['y']], [G_routing.nodes[v]['x'], G_routing.nodes[v]['y']]])
+                        segments.append(np.array([node_xy[u], node_xy[v]], dtype=np.float64))
+
+            full_path_coords = np.concatenate(segments) if segments else np.empty((0, 2), dtype=np.float64)
 
             feature = {"type": "Feature", "properties": {"vehicle_id": vehicle_idx, "type": "route"}, "geometry": {"type": "LineString", "coordinates": full_path_coords}}
             routes_features.append(feature)
 
-        return JSONResponse(content={
+        # orjson writes the coordinate arrays directly, without building Python lists
+        content: bytes = orjson.dumps({
             "type": "FeatureCollection",
             "features": routes_features,
-        }, status_code=HTTP_200_OK)
+        }, option=orjson.OPT_SERIALIZE_NUMPY)
+        return Response(content=content, media_type="application/json", status_code=HTTP_200_OK)
     except Exception as e:
         from traceback import print_exc
         print_exc()
@@ -13,11 +13,13 @@ from typing import (
     Optional,
     List,
     Dict,
+    Literal,
+    Union,
+    Annotated,
 )
 from pydantic import (
     BaseModel,
     Field,
-    model_validator,
 )
 ########################
 
@@ -40,18 +42,22 @@ class MapData(BaseModel):
 
 class NodeData(BaseModel):
     id: int
-    x: float
-    y: float
+    x: float = Field(..., allow_inf_nan=False, description="Longitude, must be finite")
+    y: float = Field(..., allow_inf_nan=False, description="Latitude, must be finite")
     type: NodeType
     urgency: Optional[int] = None
     count: Optional[int] = None
 
-    @model_validator(mode='after')
-    def validate_data(self):
-        if self.type == NodeType.SURVIVOR:
-            if self.urgency is None or self.count is None:
-                raise ValueError("Survivor nodes require 'urgency' and 'count'")
-        return self
+class SurvivorNodeData(NodeData):
+    type: Literal[NodeType.SURVIVOR]
+    urgency: int
+    count: int
+
+class PickupNodeData(NodeData):
+    type: Literal[NodeType.PICKUP]
+
+# Tagged on `type` so survivor requirements are checked by the schema itself (no Python validator per node)
+RouteNode = Annotated[Union[SurvivorNodeData, PickupNodeData], Field(discriminator='type')]
 
 class EdgeModification(BaseModel):
     u: int
@@ -61,12 +67,12 @@ class EdgeModification(BaseModel):
 
 class RouteRequest(BaseModel):
     graph_uuid: Optional[str] = None
-    nodes: List[NodeData]
+    nodes: List[RouteNode]
     modified_edges: List[EdgeModification]
     start_location: Dict[str, float]
     bbox: Bbox
 
 class Data(BaseModel):
     mapData: MapData
-    nodes: List[NodeData]
+    nodes: List[RouteNode]
 ########################
\ No newline at end of file
@@ -8,7 +8,8 @@ Copyright (c) 2025
 """
 
 # ========== IMPORTING LIBRARIES ========== #
-from time import time
+from itertools import count
+from weakref import WeakKeyDictionary
 from typing import (
     List,
     Tuple,
@@ -17,20 +18,15 @@ from typing import (
     Optional,
     Any,
 )
-from math import (
-    sin,
-    cos,
-    sqrt,
-    atan2,
-    radians,
-)
-
-from geopandas import GeoDataFrame
+import numpy as np
+import orjson
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 from osmnx import (
     graph_from_point as graph,
     graph_from_bbox as graph_bbox,
     graph_to_gdfs,
-    nearest_edges,
 )
 
 from networkx import (
@@ -39,14 +35,22 @@ from networkx import (
     NetworkXError,
     set_edge_attributes,
 )
-from shapely.geometry import (
-    Point,
-    LineString,
+from shapely.geometry import LineString
+from shapely import (
+    STRtree,
+    get_coordinates,
+    get_num_coordinates,
+    points,
 )
-from shapely.ops import substring
 
+from .utils_fast import (
+    haversine_array,
+    haversine_distance,
+    split_polyline,
+)
 from .models import (
     NodeData,
+    NodeType,
     EdgeModification
 )
 ########################
@@ -89,35 +93,138 @@ def download_graph_bbox(north: float, south: float, east: float, west: float) ->
         raise NetworkXError(str(e))
     return G
 
-def graph_to_json(G: MultiDiGraph) -> str:
+def graph_to_json(G: MultiDiGraph) -> bytes:
     """Converts graph to GeoJSON format for frontend visualization
 
+       Features are built straight from the edge data (no GeoDataFrame) and
+       all coordinates are extracted from the geometries in one vectorized call.
+
     Args:
         G (MultiDiGraph): The graph to convert
 
     Returns:
-        str: JSON string containing graph edges and properties
+        bytes: JSON document containing graph edges and properties
+    """
+    edges = list(G.edges(keys=True, data=True))
+    nodes = G._node
+
+    # Edges without geometry are drawn as a straight line between their nodes
+    geoms = [
+        d['geometry'] if 'geometry' in d
+        else LineString([(nodes[u]['x'], nodes[u]['y']), (nodes[v]['x'], nodes[v]['y'])])
+        for u, v, _, d in edges
+    ]
+    coords = get_coordinates(geoms)
+    bounds = np.cumsum(get_num_coordinates(geoms))[:-1]
+
+    features = []
+    for i, ((u, v, k, d), line) in enumerate(zip(edges, np.split(coords, bounds))):
+        properties = {'u': u, 'v': v, 'key': k}
+        properties.update((name, value) for name, value in d.items() if name != 'geometry')
+        features.append({
+            'id': str(i),
+            'type': 'Feature',
+            'properties': properties,
+            'geometry': {'type': 'LineString', 'coordinates': line},
+        })
+
+    return orjson.dumps({'type': 'FeatureCollection', 'features': features}, option=orjson.OPT_SERIALIZE_NUMPY)
+########################
+
+
+
+# ========== GRAPH CACHE ========== #
+class GraphCache:
+    """Structures derived from a graph, built lazily on first use
+
+       Holds no reference to the graph itself so it can live in a weak-keyed cache.
+    """
+
+    def __init__(self) -> None:
+        self.edge_ids: Any = None
+        self.edge_tree: Optional[STRtree] = None
+
+    def get_edge_index(self, G: Union[MultiDiGraph, MultiGraph]) -> Tuple[Any, STRtree]:
+        if self.edge_tree is None:
+            geoms = graph_to_gdfs(G, nodes=False)["geometry"]
+            self.edge_ids = geoms.index
+            self.edge_tree = STRtree(geoms.values)
+        return self.edge_ids, self.edge_tree
+
+# Caches live as long as their graph and are rebuilt when its node or edge count changes
+_graph_caches: "WeakKeyDictionary[Union[MultiDiGraph, MultiGraph], Tuple[int, int, GraphCache]]" = WeakKeyDictionary()
+
+def get_graph_cache(G: Union[MultiDiGraph, MultiGraph]) -> GraphCache:
+    """Returns the cache of derived structures for a graph
+
+    Args:
+        G (MultiDiGraph): The graph
+
+    Returns:
+        GraphCache: The cache, rebuilt if the graph topology changed since it was created
+    """
+    n_nodes: int = G.number_of_nodes()
+    n_edges: int = G.number_of_edges()
+    cached = _graph_caches.get(G)
+    if cached is not None and cached[0] == n_nodes and cached[1] == n_edges:
+        return cached[2]
+
+    cache = GraphCache()
+    _graph_caches[G] = (n_nodes, n_edges, cache)
+    return cache
+
+def invalidate_graph_cache(G: Union[MultiDiGraph, MultiGraph]) -> None:
+    """Drops the cached structures of a graph after its topology changed
+
+    Args:
+        G (MultiDiGraph): The modified graph
+    """
+    _graph_caches.pop(G, None)
+
+def get_edge_index(G: Union[MultiDiGraph, MultiGraph]) -> Tuple[Any, STRtree]:
+    """Returns the edge IDs and an STRtree over the edge geometries of a graph
+
+       The result is cached per graph object so repeated lookups skip
+       rebuilding the edge GeoDataFrame and the tree.
+
+    Args:
+        G (MultiDiGraph): The graph to index
+
+    Returns:
+        Tuple[Index, STRtree]: The (u, v, key) index aligned with the tree's geometries, and the tree
     """
-    gdf_edges: GeoDataFrame = graph_to_gdfs(G, nodes=False).reset_index()
-    rename_map: Dict[str, str] = {}
-    cols = gdf_edges.columns
+    return get_graph_cache(G).get_edge_index(G)
+
+def nearest_edges_indexed(G: Union[MultiDiGraph, MultiGraph], xs: np.ndarray, ys: np.ndarray) -> List[Tuple[int, int, int]]:
+    """Finds the nearest edge to each point using the cached spatial index of the graph
 
-    if 'u' not in cols and 'level_0' in cols:
-        rename_map['level_0'] = 'u'
-    if 'v' not in cols and 'level_1' in cols:
-        rename_map['level_1'] = 'v'
-    if 'key' not in cols and 'level_2' in cols:
-        rename_map['level_2'] = 'key'
+    Args:
+        G (MultiDiGraph): The graph to search
+        xs (np.ndarray): The points' x (longitude) coordinates
+        ys (np.ndarray): The points' y (latitude) coordinates
 
-    if rename_map:
-        gdf_edges = gdf_edges.rename(columns=rename_map)
+    Returns:
+        List[Tuple[int, int, int]]: The (u, v, key) of the nearest edge to each point
 
-    return gdf_edges.to_json()
+    Raises:
+        ValueError: If any coordinate is NaN or infinite
+    """
+    # query_nearest returns nothing for empty (NaN) points, which would misalign the result with the input
+    if not (np.isfinite(xs).all() and np.isfinite(ys).all()):
+        raise ValueError("`xs` and `ys` must be finite")
+
+    edge_ids, tree = get_edge_index(G)
+    positions = tree.query_nearest(points(xs, ys), all_matches=False)[1]
+    assert len(positions) == len(xs), "expected exactly one nearest edge per point"
+    return list(edge_ids[positions])
 ########################
 
 
 
 # ========== GRAPH MODIFICATION ========== #
+# Integer state codes stored next to the string so readers skip string compares
+STATE_INT = {'clear': 0, 'partial': 1, 'blocked': 2}
+
 def edit_edges(G: Union[MultiDiGraph, MultiGraph], edges: List[EdgeModification]) -> Union[MultiDiGraph, MultiGraph]:
     """Updates edge states (clear/blocked/partial) in the graph
 
@@ -131,35 +238,21 @@ def edit_edges(G: Union[MultiDiGraph, MultiGraph], edges: List[EdgeModification]
     Returns:
         MultiDiGraph: Modified graph with updated edge states
     """
+    # Collect every change first and apply them in one bulk call
+    attr_map: Dict[Tuple[Any, Any, Any], Dict[str, Any]] = {}
     for edge in edges:
+        attrs = {"state": edge.state, "state_int": STATE_INT.get(edge.state, 0)}
         if G.has_edge(edge.u, edge.v, key=edge.key):
-            set_edge_attributes(G, {(edge.u, edge.v, edge.key): {"state": edge.state}})
+            attr_map[(edge.u, edge.v, edge.key)] = attrs
 
-        if G.has_edge(edge.v, edge.u):
-            for k in G[edge.v][edge.u]:
-                set_edge_attributes(G, {(edge.v, edge.u, k): {"state": edge.state}})
+        for k in G._adj.get(edge.v, {}).get(edge.u, {}):
+            attr_map[(edge.v, edge.u, k)] = attrs
 
+    set_edge_attributes(G, attr_map)
     return G
 
-def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculates great-circle distance between two geographic points
-
-    Args:
-        lat1 (float): Latitude of first point
-        lon1 (float): Longitude of first point
-        lat2 (float): Latitude of second point
-        lon2 (float): Longitude of second point
-
-    Returns:
-        float: Distance in meters between the two points
-    """
-    R: int = 6371000  # Earth radius in meters
-    phi1: float = radians(lat1)
-    phi2: float = radians(lat2)
-    dphi: float = radians(lat2 - lat1)
-    dlambda: float = radians(lon2 - lon1)
-    a: float = sin(dphi/2)**2 + cos(phi1)*cos(phi2)*sin(dlambda/2)**2
-    return 2 * R * atan2(sqrt(a), sqrt(1 - a))
+# Split nodes get negative IDs so they never clash with OSM node IDs
+_new_node_ids = count(start=-1, step=-1)
 
 def split_edge_at_point(G: Union[MultiDiGraph, MultiGraph], u: int, v: int, key: str, point_coords: Tuple[float, float]) -> Optional[int]:
     """Splits a graph edge at specified coordinates and inserts new node
@@ -168,7 +261,7 @@ def split_edge_at_point(G: Union[MultiDiGraph, MultiGraph], u: int, v: int, key:
        1. Validates edge existence and retrieves geometry
        2. Ensures geometry direction matches u->v edge direction
        3. Projects point onto line geometry to find split location
-       4. Creates new node at interpolated position
+       4. Creates new node at the projected position
        5. Splits original geometry into two segments preserving curvature
        6. Adds new edges with recalculated lengths
        7. Removes original edge
@@ -189,54 +282,57 @@ def split_edge_at_point(G: Union[MultiDiGraph, MultiGraph], u: int, v: int, key:
         return None
 
     data: Dict[str, Any] = G[u][v][key]
+
+    u_x, u_y = G.nodes[u]['x'], G.nodes[u]['y']
+    v_x, v_y = G.nodes[v]['x'], G.nodes[v]['y']
     
     # Get Geometry or create straight line if missing
     if 'geometry' in data:
-        line = data['geometry']
+        coords = np.asarray(data['geometry'].coords, dtype=np.float64)
     else:
         # Create straight line between nodes if no geometry data exists
-        line = LineString([(G.nodes[u]['x'], G.nodes[u]['y']), (G.nodes[v]['x'], G.nodes[v]['y'])])
+        coords = np.array([(u_x, u_y), (v_x, v_y)], dtype=np.float64)
     
     # Ensure Geometry aligns with u->v direction before splitting
-    u_x, u_y = G.nodes[u]['x'], G.nodes[u]['y']
-    start_x, start_y = line.coords[0]
+    start_x, start_y = coords[0]
 
     # Calculate squared distance from u to line start and end points
     dist_start = (u_x - start_x)**2 + (u_y - start_y)**2
-    end_x, end_y = line.coords[-1]
+    end_x, end_y = coords[-1]
     dist_end = (u_x - end_x)**2 + (u_y - end_y)**2
 
     # If line end is closer to u than line start, geometry is reversed
     if dist_end < dist_start:
         # The geometry is reversed relative to u->v. Reverse it for splitting.
-        line = LineString(list(line.coords)[::-1])
+        coords = coords[::-1]
     
-    # Project point onto the line geometry
-    p = Point(point_coords)
-    dist_along = line.project(p) # Distance from start of line
+    # Project point onto the line and split its vertices there in one pass
+    new_x, new_y, coords_u_new, coords_new_v = split_polyline(coords, point_coords[0], point_coords[1])
     
     # Create New Node with unique negative ID to avoid conflicts
-    new_node_id = hash(f"{u}-{v}-{key}-{time()}") % 10000000 * -1
-    new_point = line.interpolate(dist_along)
-    G.add_node(new_node_id, x=new_point.x, y=new_point.y)
+    new_node_id = next(_new_node_ids)
+    while new_node_id in G._node:
+        new_node_id = next(_new_node_ids)
+    G.add_node(new_node_id, x=new_x, y=new_y)
     
-    # Split Geometry Preserving Curvature using substring
-    geom_u_new = substring(line, 0, dist_along)
-    geom_new_v = substring(line, dist_along, line.length)
+    # Split Geometry Preserving Curvature
+    geom_u_new = LineString(coords_u_new)
+    geom_new_v = LineString(coords_new_v)
     
     # Add new edges with updated geometry and recalculated lengths
-    len_1 = haversine_distance(G.nodes[u]['y'], G.nodes[u]['x'], new_point.y, new_point.x)
+    len_1 = haversine_distance(u_y, u_x, new_y, new_x)
     attr1 = data.copy()
     attr1.update({'length': len_1, 'geometry': geom_u_new})
     G.add_edge(u, new_node_id, key=0, **attr1)
     
-    len_2 = haversine_distance(new_point.y, new_point.x, G.nodes[v]['y'], G.nodes[v]['x'])
+    len_2 = haversine_distance(new_y, new_x, v_y, v_x)
     attr2 = data.copy()
     attr2.update({'length': len_2, 'geometry': geom_new_v})
     G.add_edge(new_node_id, v, key=0, **attr2)
     
     # Remove original edge since it has been split
     G.remove_edge(u, v, key)
+    invalidate_graph_cache(G)
     return new_node_id
 ########################
 
@@ -247,52 +343,100 @@ def deduplicate_nodes(nodes: List[NodeData]) -> List[NodeData]:
     """Removes duplicate nodes within 10m tolerance and merges their properties
         
        Merges urgency (takes maximum) and counts (sums) for duplicate nodes to
-       prevent multiple splits at nearly identical locations.
+       prevent multiple splits at nearly identical locations. Nodes of the same type
+       chained within the tolerance of each other form one cluster, found with a KD-tree.
 
     Args:
         nodes (List[NodeData]): List of node data to deduplicate
 
     Returns:
         List[NodeData]: Deduplicated list with merged properties
+
+    Raises:
+        ValueError: If any node coordinate is NaN or infinite
     """
+    if not nodes:
+        return []
+
+    # Project to local meters (equirectangular) so the tolerance is a plain euclidean radius
+    lats = np.array([node.y for node in nodes], dtype=np.float64)
+    lons = np.array([node.x for node in nodes], dtype=np.float64)
+    # A single NaN would turn the mean latitude (and so every projected x) into NaN and silently find no pairs
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        raise ValueError("Node coordinates must be finite")
+    x_m = lons * np.cos(np.radians(lats.mean())) * 111320.0
+    y_m = lats * 110540.0
+
+    # Pairs within 10 meters tolerance, grouped transitively into clusters
+    # Only nodes of the same type merge (a survivor next to a pickup must stay a survivor)
+    pairs = cKDTree(np.column_stack([x_m, y_m])).query_pairs(r=10.0, output_type='ndarray')
+    type_codes = {node_type: i for i, node_type in enumerate(NodeType)}
+    types = np.array([type_codes[node.type] for node in nodes], dtype=np.int8)
+    pairs = pairs[types[pairs[:, 0]] == types[pairs[:, 1]]]
+    adjacency = coo_matrix(
+        (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+        shape=(len(nodes), len(nodes)),
+    )
+    n_clusters, labels = connected_components(adjacency, directed=False)
+
+    # Merge logic: max urgency and summed counts per cluster
+    urgencies = np.array([node.urgency or 0 for node in nodes], dtype=np.int64)
+    counts = np.array([node.count or 0 for node in nodes], dtype=np.int64)
+    cluster_urgency = np.zeros(n_clusters, dtype=np.int64)
+    np.maximum.at(cluster_urgency, labels, urgencies)
+    cluster_count = np.bincount(labels, weights=counts, minlength=n_clusters).astype(np.int64)
+    cluster_size = np.bincount(labels, minlength=n_clusters)
+
+    # Keep the first node of every cluster, in the original order
+    _, first_idx = np.unique(labels, return_index=True)
     unique_nodes = []
-    for node in nodes:
-        is_duplicate = False
-        for existing in unique_nodes:
-            dist = haversine_distance(node.y, node.x, existing.y, existing.x)
-            if dist < 10.0: # 10 meters tolerance
-                # Merge logic: Keep the existing one, maybe update urgency/count?
-                # For now, just skipping is enough to prevent double-split.
-                # Or update max urgency
-                existing.urgency = max(existing.urgency, node.urgency if node.urgency is not None else 0.0)
-                existing.count += node.count
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            unique_nodes.append(node)
+    for i in np.sort(first_idx).tolist():
+        node = nodes[i]
+        label = labels[i]
+        if cluster_size[label] > 1:
+            node.urgency = int(cluster_urgency[label])
+            node.count = int(cluster_count[label])
+        unique_nodes.append(node)
     return unique_nodes
 
-def integrate_nodes_into_graph(G: Union[MultiDiGraph, MultiGraph], nodes: List[NodeData]) \
+def integrate_nodes_into_graph(G: Union[MultiDiGraph, MultiGraph], nodes: List[NodeData],
+                               index_graph: Optional[MultiGraph] = None) \
     -> Tuple[Union[MultiDiGraph, MultiGraph], List[Dict[str, Any]]]:
     """Intelligently integrates survivor nodes into the road network graph
 
     Args:
         G (MultiDiGraph): Graph to modify
         nodes (List[NodeData]): Survivor nodes to integrate
+        index_graph (Optional[MultiGraph]): Graph with the same edges as G (e.g. the cached graph
+            G was copied from) whose spatial index can be reused across calls, defaults to G
 
     Returns:
         Tuple[MultiDiGraph, List[NodeData]]: (Modified graph, List of snapped node mappings)
     """
     snapped_nodes = []
-    # Convert to undirected graph for nearest edge search
-    # This ensures we find the closest road segment regardless of directionality
-    G_undir = G.to_undirected()
+
+    if not nodes:
+        return G, snapped_nodes
+
+    # The edge STRtree covers both directions of a road, so G can be indexed as is
+    # (no undirected copy); the edge lookups below already try (u, v) and (v, u)
+    if index_graph is None:
+        index_graph = G
+
+    # Find the nearest edge to every node's location in a single vectorized query
+    xs = np.array([node_req.x for node_req in nodes], dtype=np.float64)
+    ys = np.array([node_req.y for node_req in nodes], dtype=np.float64)
+    nearest = nearest_edges_indexed(index_graph, xs, ys)
+
+    # Distances from every node to both endpoints of its nearest edge, in one vectorized pass
+    node_data = G._node
+    u_xy = np.array([(node_data[u]['x'], node_data[u]['y']) for u, _, _ in nearest], dtype=np.float64)
+    v_xy = np.array([(node_data[v]['x'], node_data[v]['y']) for _, v, _ in nearest], dtype=np.float64)
+    dists_u = haversine_array(ys, xs, u_xy[:, 1], u_xy[:, 0]).tolist()
+    dists_v = haversine_array(ys, xs, v_xy[:, 1], v_xy[:, 0]).tolist()
     
     # Process each survivor node for integration into the road network
-    for node_req in nodes:
-        # Find the nearest edge to the survivor's location
-        u, v, key = nearest_edges(G_undir, node_req.x, node_req.y)
-        
+    for node_req, (u, v, key), dist_u, dist_v in zip(nodes, nearest, dists_u, dists_v):
         # Get Edge Data to check state
         edge_data = G.get_edge_data(u, v, key) or G.get_edge_data(v, u, key)
 
@@ -305,12 +449,6 @@ def integrate_nodes_into_graph(G: Union[MultiDiGraph, MultiGraph], nodes: List[N
             
         state = edge_data.get('state', 'clear')
 
-        # Calculate distances to both endpoints of the nearest edge
-        node_u = G.nodes[u]
-        node_v = G.nodes[v]
-        dist_u: float = haversine_distance(node_req.y, node_req.x, node_u['y'], node_u['x'])
-        dist_v: float = haversine_distance(node_req.y, node_req.x, node_v['y'], node_v['x'])
-        
         final_node_id = None
         
         # Priority 1: Snap to existing intersection if close within 50 meters
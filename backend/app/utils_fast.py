@@ -0,0 +1,148 @@
+"""
+File utils_fast.py
+Author Youssef Elebiary
+Brief JIT-compiled geographic math for RescuNet
+Version 1.0
+Date 2025-11-25
+Copyright (c) 2025
+"""
+
+# ========== IMPORTING LIBRARIES ========== #
+from typing import Tuple
+from math import (
+    sin,
+    cos,
+    sqrt,
+    atan2,
+    radians,
+)
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional, fall back to plain Python if it is not installed
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+########################
+
+
+
+# ========== CONSTANTS ========== #
+EARTH_RADIUS: float = 6371000.0  # Earth radius in meters
+########################
+
+
+
+# ========== DISTANCES ========== #
+@njit(cache=True, fastmath=True)
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculates great-circle distance between two geographic points
+
+    Args:
+        lat1 (float): Latitude of first point
+        lon1 (float): Longitude of first point
+        lat2 (float): Latitude of second point
+        lon2 (float): Longitude of second point
+
+    Returns:
+        float: Distance in meters between the two points
+    """
+    phi1 = radians(lat1)
+    phi2 = radians(lat2)
+    dphi = radians(lat2 - lat1)
+    dlambda = radians(lon2 - lon1)
+    a = sin(dphi/2)**2 + cos(phi1)*cos(phi2)*sin(dlambda/2)**2
+    return 2 * EARTH_RADIUS * atan2(sqrt(a), sqrt(1 - a))
+
+@njit(cache=True, fastmath=True)
+def haversine_array(lats1: np.ndarray, lons1: np.ndarray, lats2: np.ndarray, lons2: np.ndarray) -> np.ndarray:
+    """Calculates element-wise great-circle distances between two arrays of points
+
+    Args:
+        lats1 (np.ndarray): Latitudes of the first points
+        lons1 (np.ndarray): Longitudes of the first points
+        lats2 (np.ndarray): Latitudes of the second points
+        lons2 (np.ndarray): Longitudes of the second points
+
+    Returns:
+        np.ndarray: Distances in meters between each pair of points
+    """
+    out = np.empty(lats1.shape[0], dtype=np.float64)
+    for i in range(lats1.shape[0]):
+        out[i] = haversine_distance(lats1[i], lons1[i], lats2[i], lons2[i])
+    return out
+########################
+
+
+
+# ========== GEOMETRY ========== #
+@njit(cache=True)
+def project_on_polyline(coords: np.ndarray, px: float, py: float) -> Tuple[int, float, float, float]:
+    """Finds the closest point on a polyline to a given point in a single pass
+
+    Args:
+        coords (np.ndarray): (N, 2) array of the polyline vertices
+        px (float): X coordinate of the point
+        py (float): Y coordinate of the point
+
+    Returns:
+        Tuple[int, float, float, float]: (Segment index, Position along the segment in [0, 1], X, Y)
+    """
+    best_idx = 0
+    best_t = 0.0
+    best_x = coords[0, 0]
+    best_y = coords[0, 1]
+    best_dist = (px - best_x)**2 + (py - best_y)**2
+    for i in range(coords.shape[0] - 1):
+        x0 = coords[i, 0]
+        y0 = coords[i, 1]
+        dx = coords[i + 1, 0] - x0
+        dy = coords[i + 1, 1] - y0
+
+        # Closest point on the segment, clamped to its endpoints
+        seg_len2 = dx*dx + dy*dy
+        t = 0.0
+        if seg_len2 > 0.0:
+            t = min(max(((px - x0)*dx + (py - y0)*dy) / seg_len2, 0.0), 1.0)
+        cx = x0 + t*dx
+        cy = y0 + t*dy
+
+        dist = (px - cx)**2 + (py - cy)**2
+        if dist < best_dist:
+            best_idx = i
+            best_t = t
+            best_x = cx
+            best_y = cy
+            best_dist = dist
+    return best_idx, best_t, best_x, best_y
+
+def split_polyline(coords: np.ndarray, px: float, py: float) -> Tuple[float, float, np.ndarray, np.ndarray]:
+    """Splits a polyline at the point closest to a given point
+
+    Args:
+        coords (np.ndarray): (N, 2) array of the polyline vertices
+        px (float): X coordinate of the point
+        py (float): Y coordinate of the point
+
+    Returns:
+        Tuple[float, float, np.ndarray, np.ndarray]: (X, Y of the split point, Vertices before it, Vertices after it)
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    idx, t, x, y = project_on_polyline(coords, px, py)
+    split = np.array([[x, y]], dtype=np.float64)
+
+    # Reuse a vertex the split point falls on instead of duplicating it (keeping at least 2 points per half)
+    if t == 0.0 and idx > 0:
+        left = coords[:idx + 1]
+    else:
+        left = np.concatenate((coords[:idx + 1], split))
+    if t == 1.0 and idx + 2 < coords.shape[0]:
+        right = coords[idx + 1:]
+    else:
+        right = np.concatenate((split, coords[idx + 1:]))
+    return x, y, left, right
+########################
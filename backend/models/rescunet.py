@@ -1,4 +1,4 @@
-import math
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -8,52 +8,43 @@ from torch_geometric.nn import GINEConv
 from typing import Union
 from networkx import MultiDiGraph, MultiGraph
 
-def extract_pyg_data(G: Union[MultiDiGraph, MultiGraph]) -> tuple[Data, list[tuple[str, str, int]]]:
-    """Converts NetworkX graph to PyG Data object matching training format."""
+def extract_pyg_data(G: Union[MultiDiGraph, MultiGraph]) -> tuple[Data, list[tuple[str, str, int]], np.ndarray, np.ndarray]:
+    """Converts NetworkX graph to PyG Data object matching training format.
+
+    Also returns the raw edge lengths and integer states aligned with the edge order.
+    """
     node_list = list(G.nodes())
     node_map = {n: i for i, n in enumerate(node_list)}
+    n_nodes = len(node_list)
+
+    # Type codes (road=0, survivor=1, pickup/assembly=2) are stored on the nodes as `type_int`
+    node_data = [d for _, d in G.nodes(data=True)]
+    node_feats = np.empty((n_nodes, 3), dtype=np.float32)
+    node_feats[:, 0] = np.fromiter((d.get('type_int', 0) for d in node_data), dtype=np.float32, count=n_nodes)
+    node_feats[:, 1] = np.fromiter((d.get('urgency', 0.0) for d in node_data), dtype=np.float32, count=n_nodes)
+    node_feats[:, 2] = np.fromiter((d.get('survivor_count', 0.0) for d in node_data), dtype=np.float32, count=n_nodes)
+    
+    x = torch.from_numpy(node_feats)
 
-    # Type Map: road=0, survivor=1, pickup/assembly=2
-    type_map = {'road': 0, 'survivor': 1, 'pickup': 2, 'assembly': 2}
+    edges = list(G.edges(keys=True, data=True))
+    n_edges = len(edges)
+    ordered_edges = [(u, v, k) for u, v, k, _ in edges]
     
-    node_feats = []
-    for n in node_list:
-        d = G.nodes[n]
-        t = type_map.get(d.get('type', 'road'), 0)
-        u = float(d.get('urgency', 0.0))
-        c = float(d.get('survivor_count', 0.0))
-        node_feats.append([t, u, c])
+    edge_indices = np.empty((2, n_edges), dtype=np.int64)
+    edge_indices[0] = np.fromiter((node_map[u] for u, _, _, _ in edges), dtype=np.int64, count=n_edges)
+    edge_indices[1] = np.fromiter((node_map[v] for _, v, _, _ in edges), dtype=np.int64, count=n_edges)
     
-    x = torch.tensor(node_feats, dtype=torch.float)
-
-    edge_indices = []
-    edge_attrs = []
+    lengths = np.fromiter((d.get('length', 1.0) for _, _, _, d in edges), dtype=np.float64, count=n_edges)
     
-    ordered_edges = [] 
+    # State codes (clear=0, partial=1, blocked=2) are stored on the edges as `state_int` by edit_edges
+    states = np.fromiter((d.get('state_int', 0) for _, _, _, d in edges), dtype=np.uint8, count=n_edges)
     
-    for u, v, k, d in G.edges(keys=True, data=True):
-        if u not in node_map or v not in node_map: continue
-        
-        u_idx = node_map[u]
-        v_idx = node_map[v]
-        edge_indices.append([u_idx, v_idx])
-        ordered_edges.append((u, v, k))
-        
-        dist = float(d.get('length', 1.0))
-        log_dist = math.log1p(dist)
-        
-        # State map: clear=0, partial=1, blocked=2
-        state_str = d.get('state', 'clear')
-        state_val = 0.0
-        if state_str == 'partial': state_val = 1.0
-        elif state_str == 'blocked': state_val = 2.0
-            
-        edge_attrs.append([log_dist, state_val])
-
-    edge_index = torch.tensor(edge_indices, dtype=torch.long).t().contiguous()
-    edge_attr = torch.tensor(edge_attrs, dtype=torch.float)
+    edge_attrs = np.column_stack((np.log1p(lengths), states)).astype(np.float32)
+
+    edge_index = torch.from_numpy(edge_indices)
+    edge_attr = torch.from_numpy(edge_attrs)
     
-    return Data(x=x, edge_index=edge_index, edge_attr=edge_attr), ordered_edges
+    return Data(x=x, edge_index=edge_index, edge_attr=edge_attr), ordered_edges, lengths, states
 
 
 class RescuNet(nn.Module):
@@ -113,11 +104,15 @@ class RescuNet(nn.Module):
             nn.Linear(hidden_dim // 2, 1),
         )
 
+        # Dtype the float inputs are cast to (switched to FP16 by load_model on GPU)
+        self.compute_dtype = torch.float32
+
     def forward(self, x, edge_index, edge_attr, batch=None):
         if batch is None:
             batch = torch.zeros(x.size(0), dtype=torch.long, device=x.device)
         node_types = x[:, 0].long()
-        node_nums = x[:, 1:]
+        node_nums = x[:, 1:].to(self.compute_dtype)
+        edge_attr = edge_attr.to(self.compute_dtype)
 
         emb = self.emb(node_types)
         proj = self.proj(node_nums)
@@ -136,8 +131,33 @@ class RescuNet(nn.Module):
         logits = self.decoder(edge_feat_final).squeeze(-1)
         return logits
 
-    def load_model(self, model_path, device):
+    def load_model(self, model_path, device, compile: bool = True, quantize: bool = True):
         state_dict = torch.load(model_path, map_location=device, weights_only=True)
         self.load_state_dict(state_dict)
         self.to(device)
-        self.eval()
\ No newline at end of file
+        self.eval()
+
+        # Inference only: FP16 weights on GPU, int8 dynamic quantization of the Linear layers on CPU
+        if quantize:
+            if torch.device(device).type == "cuda":
+                self.half()
+                self.compute_dtype = torch.float16
+            else:
+                torch.ao.quantization.quantize_dynamic(self, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+        # Let TorchInductor fuse the residual add + ReLU blocks; node/edge counts change per request
+        if compile and hasattr(torch, "compile"):
+            eager_forward = self.forward
+            try:
+                self.forward = torch.compile(eager_forward, dynamic=True)
+
+                # Warm up here so the first request does not pay the compile time
+                n_nodes, n_edges = 8, 16
+                x = torch.zeros((n_nodes, 3), device=device)
+                edge_index = torch.randint(0, n_nodes, (2, n_edges), device=device)
+                edge_attr = torch.zeros((n_edges, 2), device=device)
+                with torch.no_grad():
+                    self.forward(x, edge_index, edge_attr)
+            except Exception as e:
+                print(f"Warning: Could not compile Rescunet model, running eagerly: {e}")
+                self.forward = eager_forward
\ No newline at end of file
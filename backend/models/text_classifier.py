@@ -1,6 +1,5 @@
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
 
 class TextClassifier(nn.Module):
     """
@@ -33,8 +32,8 @@ class TextClassifier(nn.Module):
         
         lstm_out, _ = self.lstm(embedded)
         
-        lstm_out = lstm_out.permute(0, 2, 1)
-        pooled = F.max_pool1d(lstm_out, lstm_out.size(2)).squeeze(2)
+        # Global max pooling over time, straight on the (batch, seq, features) layout
+        pooled = lstm_out.max(dim=1).values
         
         pooled = self.dropout(pooled)
         logits = self.fc(pooled)
@@ -44,13 +43,15 @@ class TextClassifier(nn.Module):
             
         return logits
 
-def load_text_classifier(model_path: str, device: str = None):
+def load_text_classifier(model_path: str, device: str = None, quantize: bool = True, compile: bool = True):
     """
     Loads the model and vocabulary from the checkpoint.
     
     Args:
         model_path (str): Path to the .pt file.
         device (str): Device to load ('cpu' or 'cuda'). Auto-detects if None.
+        quantize (bool): Use FP16 weights on GPU or int8 dynamic quantization on CPU.
+        compile (bool): Compile the model to TorchScript.
 
     Returns:
         tuple: (model, vocab) -> Returns both so inference can tokenize correctly.
@@ -76,5 +77,19 @@ def load_text_classifier(model_path: str, device: str = None):
     model.to(device)
     model.eval()
     
-    # 4. Return model AND vocab (accessed via conf['vocab'])
+    # 4. Reduce precision for inference (LSTM and Linear dominate the cost)
+    if quantize:
+        if torch.device(device).type == "cuda":
+            model.half()
+        else:
+            model = torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+    
+    # 5. Compile to TorchScript (scripted rather than traced so the use_temperature branch survives)
+    if compile:
+        try:
+            model = torch.jit.script(model)
+        except Exception as e:
+            print(f"Warning: Could not script Text classifier model, running eagerly: {e}")
+    
+    # 6. Return model AND vocab (accessed via conf['vocab'])
     return model, conf['vocab']
\ No newline at end of file
@@ -12,16 +12,76 @@ from typing import (
     List,
     Dict,
     Any,
+    Tuple,
     Union
 )
 
+import numpy as np
+
 from networkx import (
     MultiDiGraph,
     MultiGraph,
-    NetworkXNoPath,
-    shortest_path,
-    shortest_path_length,
 )
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+########################
+
+
+
+# ========== SEARCH HELPERS ========== #
+class CSRGraph:
+    """Compressed sparse row view of a graph for compiled shortest path searches"""
+
+    def __init__(self, G: Union[MultiDiGraph, MultiGraph], weight: str = 'travel_cost'):
+        self.nodes = list(G.nodes)
+        self.node_idx = {node: i for i, node in enumerate(self.nodes)}
+
+        edges = G.edges(data=weight, default=1)
+        n_edges = G.number_of_edges()
+        rows = np.fromiter((self.node_idx[u] for u, _, _ in edges), dtype=np.int64, count=n_edges)
+        cols = np.fromiter((self.node_idx[v] for _, v, _ in edges), dtype=np.int64, count=n_edges)
+        weights = np.fromiter((w for _, _, w in edges), dtype=np.float64, count=n_edges)
+
+        # Undirected edges can be travelled both ways
+        if not G.is_directed():
+            rows, cols = np.concatenate((rows, cols)), np.concatenate((cols, rows))
+            weights = np.concatenate((weights, weights))
+
+        # Parallel edges: keep the cheapest one (csr_matrix would sum them)
+        order = np.lexsort((weights, cols, rows))
+        rows, cols, weights = rows[order], cols[order], weights[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+
+        n = len(self.nodes)
+        self.matrix = csr_matrix((weights[first], (rows[first], cols[first])), shape=(n, n))
+
+    def search(self, sources: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Runs Dijkstra from every source in one compiled call
+
+        Args:
+            sources (List[int]): Source node IDs
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (Distance matrix, Predecessor matrix) with one row per source
+        """
+        indices = [self.node_idx[node] for node in sources]
+        return dijkstra(self.matrix, directed=True, indices=indices, return_predecessors=True)
+
+    def build_path(self, predecessors: np.ndarray, target: int) -> List[int]:
+        """Walks a predecessor row back from the target to its source
+
+        Args:
+            predecessors (np.ndarray): Predecessor row of the source
+            target (int): The node ID to reach
+
+        Returns:
+            List[int]: The path of node IDs from the source to the target
+        """
+        path = [self.node_idx[target]]
+        while predecessors[path[-1]] >= 0:
+            path.append(predecessors[path[-1]])
+        return [self.nodes[i] for i in reversed(path)]
 ########################
 
 
@@ -49,93 +109,77 @@ def solve_routes(G: Union[MultiDiGraph, MultiGraph], survivors: List[Dict[str, A
             'total_distance': 0.0
         })
     
+    # Build the sparse graph once for every search of this request
+    csr = CSRGraph(G, weight='travel_cost')
+    
     # Copy list to be mutable
     remaining_survivors = survivors[:] 
     
     # Assign Survivors
     while remaining_survivors:
-        best_global_score = float('inf')
-        best_vehicle_idx = -1
-        best_survivor_idx = -1
-        best_segment_dist = 0
+        # One search per vehicle position, all in a single compiled call
+        dist, pred = csr.search([vehicle['current_node'] for vehicle in pickup_vec])
         
-        # Check every pickup node with every survivor node for route optimization
-        for v_idx, vehicle in enumerate(pickup_vec):
-            current_pos = vehicle['current_node']
-            
-            for s_idx, survivor in enumerate(remaining_survivors):
-                target_id = survivor['graph_id']
-                
-                if current_pos == target_id: continue 
-                
-                try:
-                    # Get the path between start and target using Dijkstra's algorithm
-                    dist = shortest_path_length(G, current_pos, target_id, weight='travel_cost')
-                    
-                    # Calculate the arrival time
-                    arrival_time = vehicle['total_distance'] + dist
-                    
-                    urgency = survivor['req'].urgency
-                    count = survivor['req'].count
-                    
-                    # Scoring formula: balance response time against impact
-                    # Lower scores = higher priority
-                    # urgency² gives exponential weight to critical cases
-                    # + count ensures groups aren't overlooked
-                    score = arrival_time / ( (urgency**2) + count )
-                    
-                    # Check if current score is better the global minimum
-                    if score < best_global_score:
-                        # Updating the global minimum variables
-                        best_global_score = score
-                        best_vehicle_idx = v_idx
-                        best_survivor_idx = s_idx
-                        best_segment_dist = dist
-                except NetworkXNoPath:
-                    continue
+        # Arrival time of every vehicle at every remaining survivor
+        target_idx = [csr.node_idx[survivor['graph_id']] for survivor in remaining_survivors]
+        odometers = np.array([vehicle['total_distance'] for vehicle in pickup_vec], dtype=np.float64)
+        arrival = dist[:, target_idx] + odometers[:, None]
+        
+        # Scoring formula: balance response time against impact
+        # Lower scores = higher priority
+        # urgency² gives exponential weight to critical cases
+        # + count ensures groups aren't overlooked
+        weights = np.array([(survivor['req'].urgency ** 2) + survivor['req'].count for survivor in remaining_survivors], dtype=np.float64)
+        scores = arrival / weights
+        
+        # A vehicle never "reaches" a survivor sitting on its current node (matches the C++ solver)
+        source_idx = np.array([csr.node_idx[vehicle['current_node']] for vehicle in pickup_vec])
+        scores[source_idx[:, None] == np.array(target_idx)[None, :]] = np.inf
+        
+        # Row-major argmin keeps the first (vehicle, survivor) pair on ties
+        best_vehicle_idx, best_survivor_idx = np.unravel_index(int(scores.argmin()), scores.shape)
         
         # Checking if all survivors are reachable
-        if best_vehicle_idx == -1:
+        if not np.isfinite(scores[best_vehicle_idx, best_survivor_idx]):
             break
         
         # Winner found
         winner_vehicle = pickup_vec[best_vehicle_idx]
         target_survivor = remaining_survivors[best_survivor_idx]
+        target_id = target_survivor['graph_id']
         
-        # Calculate path geometry
-        path_segment = shortest_path(G, winner_vehicle['current_node'], target_survivor['graph_id'], weight='travel_cost')
+        # Rebuild the path geometry from the predecessor row
+        path_segment = csr.build_path(pred[best_vehicle_idx], target_id)
         
         # Append path (skip first node to avoid duplication)
         if len(path_segment) > 1:
             winner_vehicle['path'].extend(path_segment[1:])
         
         # Update State
-        winner_vehicle['current_node'] = target_survivor['graph_id']
-        winner_vehicle['total_distance'] += best_segment_dist
+        winner_vehicle['current_node'] = target_id
+        winner_vehicle['total_distance'] = float(arrival[best_vehicle_idx, best_survivor_idx])
         remaining_survivors.pop(best_survivor_idx)
     
     # Return survivors to nearest pickup
     all_paths = []
     
-    for vehicle in pickup_vec:
-        # Skip unused vehicles
-        if len(vehicle['path']) <= 1: continue
-        
-        best_return_dist = float('inf')
-        best_return_path = []
-        
-        for pid in pickups_ids:
-            try:
-                d = shortest_path_length(G, vehicle['current_node'], pid, weight='travel_cost')
-                if d < best_return_dist:
-                    best_return_dist = d
-                    best_return_path = shortest_path(G, vehicle['current_node'], pid, weight='travel_cost')
-            except: continue
+    # Skip unused vehicles
+    used_vehicles = [vehicle for vehicle in pickup_vec if len(vehicle['path']) > 1]
+    if used_vehicles:
+        # Lengths and paths to every pickup come out of the same search
+        dist, pred = csr.search([vehicle['current_node'] for vehicle in used_vehicles])
+        pickup_idx = [csr.node_idx[pid] for pid in pickups_ids]
         
-        if best_return_path and len(best_return_path) > 1:
-            vehicle['path'].extend(best_return_path[1:])
-        
-        all_paths.append(vehicle['path'])
+        for row, vehicle in enumerate(used_vehicles):
+            return_dist = dist[row, pickup_idx]
+            best_pickup = int(return_dist.argmin())
+            
+            if np.isfinite(return_dist[best_pickup]):
+                best_return_path = csr.build_path(pred[row], pickups_ids[best_pickup])
+                if len(best_return_path) > 1:
+                    vehicle['path'].extend(best_return_path[1:])
+            
+            all_paths.append(vehicle['path'])
         
     return all_paths
 ########################
\ No newline at end of file
@@ -14,12 +14,14 @@
 // Including Libraries
 #include <pybind11/pybind11.h>    // PyBind11 Library
 #include <pybind11/stl.h>         // PyBind11 Standard Template Library
+#include <pybind11/numpy.h>       // PyBind11 NumPy Arrays
 #include <vector>
 #include <queue>
 #include <unordered_map>
 #include <limits>
 #include <algorithm>
 #include <cmath>
+#include <stdexcept>
 ////////////////////////
 
 
@@ -343,6 +345,25 @@ public:
 
 // Function Declarations
 
+/**
+ * @brief Converts the survivor dictionaries coming from Python into `Survivor` structs
+ * 
+ * @param survivors_dicts Survivor nodes data
+ * @return `std::vector<Survivor>` The survivor nodes
+ */
+std::vector<Survivor> extract_survivors(std::vector<py::dict> &survivors_dicts) {
+    std::vector<Survivor> survivors;
+    survivors.reserve(survivors_dicts.size());
+    for (py::dict &d : survivors_dicts) {
+        survivors.push_back({
+            d["id"].cast<NodeID>(),
+            d["urgency"].cast<int>(),
+            d["count"].cast<int>()
+        });
+    }
+    return survivors;
+}
+
 /**
  * @brief Represents the function that will be exposed to Python
  * 
@@ -365,15 +386,50 @@ std::vector<std::vector<NodeID>> solve_routes(
     }
 
     // Extract survivor data
-    std::vector<Survivor> survivors;
-    for (py::dict &d : survivors_dicts) {
-        survivors.push_back({
-            d["id"].cast<NodeID>(),
-            d["urgency"].cast<int>(),
-            d["count"].cast<int>()
-        });
+    std::vector<Survivor> survivors = extract_survivors(survivors_dicts);
+
+    // Solve the routes and return the routes
+    return router.solve_multi_routes(survivors, pickups);
+}
+
+/**
+ * @brief Overload of `solve_routes` that reads the edges from contiguous NumPy arrays
+ * 
+ * The arrays are read in place through their buffers, avoiding a Python tuple per edge
+ * 
+ * @param survivors_dicts Survivor nodes data
+ * @param pickups Pickup nodes data
+ * @param u The source node of each edge
+ * @param v The destination node of each edge
+ * @param w The weight of each edge
+ * @return `std::vector<std::vector<NodeID>>` All the routes to pickup all survivors and return to the pickup nodes
+ */
+std::vector<std::vector<NodeID>> solve_routes_arrays(
+    std::vector<py::dict> survivors_dicts, 
+    std::vector<NodeID> pickups,
+    py::array_t<NodeID, py::array::c_style | py::array::forcecast> u,
+    py::array_t<NodeID, py::array::c_style | py::array::forcecast> v,
+    py::array_t<double, py::array::c_style | py::array::forcecast> w
+) {
+    // All edge arrays must describe the same edges
+    if (u.ndim() != 1 || u.size() != v.size() || u.size() != w.size()) {
+        throw std::invalid_argument("u, v and w must be 1D arrays of the same length");
     }
 
+    // Create RescueRouter object
+    RescueRouter router;
+
+    // Add the edges to the router
+    auto u_view = u.unchecked<1>();
+    auto v_view = v.unchecked<1>();
+    auto w_view = w.unchecked<1>();
+    for (py::ssize_t i = 0; i < u_view.shape(0); ++i) {
+        router.add_edge(u_view(i), v_view(i), w_view(i));
+    }
+
+    // Extract survivor data
+    std::vector<Survivor> survivors = extract_survivors(survivors_dicts);
+
     // Solve the routes and return the routes
     return router.solve_multi_routes(survivors, pickups);
 }
@@ -401,5 +457,16 @@ PYBIND11_MODULE(rescunet, m) {
         py::arg("pickups") = "Starting nodes for rescue vehicles", 
         py::arg("edges") = "Graph edges as (from_node, to_node, weight) tuples"
     );
+
+    m.def(
+        "solve_routes",
+        &solve_routes_arrays,
+        "Calculate optimal multi-vehicle rescue paths from edges given as NumPy arrays",
+        py::arg("survivors_dicts"),
+        py::arg("pickups"),
+        py::arg("u"),
+        py::arg("v"),
+        py::arg("w")
+    );
 }
 ////////////////////////
\ No newline at end of file
@@ -1,9 +1,17 @@
+import os
 import sys
 from setuptools import setup, Extension
 import pybind11
 
+# Tune for the building CPU only when asked (wheels built with it do not run on older CPUs)
+native = os.environ.get("RESCUNET_NATIVE", "0") == "1"
+
 # Default to GCC flags (Linux/Mac/MinGW)
-cpp_args = ['-O3', '-Wall', '-std=c++17']
+cpp_args = ['-O3', '-Wall', '-std=c++17', '-ffast-math', '-flto']
+link_args = ['-flto']
+
+if native:
+    cpp_args += ['-march=native', '-mtune=native']
 
 # Only switch to MSVC flags if we are NOT using MinGW
 if sys.platform == "win32" and "gcc" not in sys.version.lower():
@@ -15,7 +23,10 @@ if sys.platform == "win32" and "gcc" not in sys.version.lower():
             break
     
     if not is_mingw:
-        cpp_args = ['/O2', '/std:c++17']
+        cpp_args = ['/O2', '/std:c++17', '/GL']
+        link_args = ['/LTCG']
+        if native:
+            cpp_args.append('/arch:AVX2')
 
 ext_modules = [
     Extension(
@@ -24,6 +35,7 @@ ext_modules = [
         include_dirs=[pybind11.get_include()],
         language='c++',
         extra_compile_args=cpp_args,
+        extra_link_args=link_args,
     ),
 ]
 